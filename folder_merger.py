@@ -1,11 +1,16 @@
 import os
+import errno
 import shutil
+import stat
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import time
-from pathlib import Path
 import queue
+import heapq
+from collections import deque
+from itertools import islice
 import logging
 import json
 import re
@@ -30,90 +35,367 @@ def get_resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
+# copy_file_range 不支持或无法跨设备时，退回普通复制的错误码
+_COPY_RANGE_FALLBACK_ERRNOS = {getattr(errno, name) for name in ('EXDEV', 'ENOSYS', 'EINVAL', 'EOPNOTSUPP', 'ENOTSUP')
+                               if hasattr(errno, name)}
+
+def _fast_copy(src, dst):
+    """复制文件内容与元数据（等同 shutil.copy2）
+
+    Linux 上优先使用 os.copy_file_range 在内核中传输数据，Btrfs/XFS 等文件系统可直接共享数据块。
+    """
+    st = os.stat(src)
+    # 命名管道打开时会一直阻塞，与 shutil.copyfile 一样直接拒绝
+    if stat.S_ISFIFO(st.st_mode):
+        raise shutil.SpecialFileError(f"`{src}` is a named pipe")
+    if not hasattr(os, 'copy_file_range') or not stat.S_ISREG(st.st_mode):
+        shutil.copy2(src, dst)
+        return
+
+    # 目标与源是同一文件（硬链接/符号链接）时，打开目标会先把源清空，与 shutil.copy2 一样直接拒绝
+    try:
+        dst_st = os.stat(dst)
+    except FileNotFoundError:
+        pass
+    else:
+        if (dst_st.st_dev, dst_st.st_ino) == (st.st_dev, st.st_ino):
+            raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            copied = 0
+            while True:
+                sent = os.copy_file_range(src_fd, dst_fd, 1 << 30)
+                if sent == 0:
+                    break
+                copied += sent
+        # 非空文件第一次调用就返回 0（如部分虚拟文件系统），说明不支持，退回普通复制
+        fallback = copied == 0 and st.st_size > 0
+    except OSError as e:
+        if e.errno not in _COPY_RANGE_FALLBACK_ERRNOS:
+            raise
+        fallback = True
+    if fallback:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 CONFIG_FILE = os.path.join(get_application_path(), 'merger_config.json')
+# 目标目录中记录各 Merged_N 文件夹文件数的缓存文件
+INDEX_FILE_NAME = '.merger_index.json'
+# 合并输出文件夹名 Merged_N（预编译，逐个目录项匹配时无需重复编译）
+MERGED_DIR_RE = re.compile(r'Merged_(\d+)')
+# 界面日志缓冲区上限，超出时丢弃中间部分
+LOG_BUFFER_LIMIT = 1000
+# 扫描线程与处理线程之间的队列长度，防止扫描过快占用大量内存
+SCAN_QUEUE_SIZE = 8192
+# 同一文件系统移动时每批处理的文件数
+RENAME_BATCH_SIZE = 256
 
 class MergerCore:
     def __init__(self, update_callback=None, log_callback=None):
         self.update_callback = update_callback
         self.log_callback = log_callback
         self.stop_flag = False
+        # 目标文件夹内已有/已分配文件名的内存索引，避免逐个 os.path.exists 探测
+        self._dir_indexes = {}
+        self._dir_casefold = {}
+        self._rename_counters = {}
+        # 移动模式下记录被移出过文件的源目录，结束后统一尝试删除（不再每个文件都 rmdir 一次）
+        self._touched_parents = set()
+        # 扫描时发现的空目录（移动模式清理时使用）
+        self._empty_dirs = []
+        # 目标文件夹计数缓存：本次统计结果、发现的全部文件夹与实际写入过的文件夹
+        self._folder_stats = {}
+        self._known_folders = []
+        self._used_targets = []
 
     def log(self, message):
         if self.log_callback:
             self.log_callback(message)
         logging.info(message)
 
-    def scan_files(self, source_dir):
-        """生成器：扫描所有文件"""
+    def scan_files(self, source_dir, target_parent=None):
+        """生成器：扫描所有文件，返回 (完整路径, 文件名, 所在文件夹名)
+
+        若指定 target_parent，则跳过其下的 Merged_N 文件夹，
+        避免目标位于源目录内时把刚写入的文件再次扫描处理。
+        任何位置的 .merger_index.json 索引缓存文件都会被跳过。
+        """
         count = 0
-        for root, dirs, files in os.walk(source_dir):
+        self._empty_dirs = []
+        target_key = os.path.normcase(os.path.abspath(target_parent)) if target_parent else None
+        # 使用 os.scandir 迭代遍历，DirEntry 自带文件类型信息，避免逐个 stat
+        pending = deque([source_dir])
+        while pending:
             if self.stop_flag:
                 break
-            for file in files:
+            current_dir = pending.popleft()
+            in_target = target_key is not None and os.path.normcase(os.path.abspath(current_dir)) == target_key
+            parent_name = os.path.basename(os.path.normpath(current_dir))
+            # 先读完整个目录并关闭句柄再逐个返回：处理方在等待队列或修改目录时不占用文件描述符，
+            # 也不会在 readdir 进行中改动正在读取的目录
+            files = []
+            is_empty = False
+            try:
+                with os.scandir(current_dir) as it:
+                    is_empty = True
+                    for entry in it:
+                        is_empty = False
+                        if self.stop_flag:
+                            break
+                        if entry.is_dir(follow_symlinks=False):
+                            if in_target and MERGED_DIR_RE.fullmatch(entry.name):
+                                continue
+                            pending.append(entry.path)
+                        elif entry.name == INDEX_FILE_NAME:
+                            # 索引缓存文件不论出现在哪一层（例如曾以源目录作为目标）都不属于待合并文件
+                            continue
+                        elif not entry.is_dir():
+                            # 与 os.walk 保持一致：指向文件的符号链接照常处理，指向目录的不递归
+                            files.append((entry.path, entry.name))
+            except OSError as e:
+                self.log(f"无法读取目录: {e}")
+            if is_empty:
+                self._empty_dirs.append(current_dir)
+            for path, name in files:
                 if self.stop_flag:
                     break
-                yield os.path.join(root, file)
+                yield path, name, parent_name
                 count += 1
                 if count % 1000 == 0:
                     if self.update_callback:
                         self.update_callback("scanning", count, None)
 
+    def _scanner(self, source_dir, target_parent, scan_queue, scan_done, consumer_done):
+        """扫描线程：把扫描结果放入有界队列，结束时放入 None，并公布文件总数"""
+        def put(item):
+            # 队列满时等待；处理线程已退出则放弃，避免永久阻塞
+            while not consumer_done.is_set():
+                try:
+                    scan_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        count = 0
+        completed = False
+        try:
+            for item in self.scan_files(source_dir, target_parent):
+                if not put(item):
+                    return
+                count += 1
+            completed = not self.stop_flag
+        finally:
+            if completed:
+                self._scan_total = count
+                scan_done.set()
+                self.log(f"扫描完成，共找到 {count} 个文件")
+            put(None)
+
+    def _is_case_insensitive(self, dir_path, names):
+        """探测目标文件夹所在文件系统是否忽略大小写（macOS、SMB/NTFS/exFAT 挂载等）
+
+        取一个大小写互换后不同的已有文件名，检查互换后的名称是否存在；
+        文件夹为空时改用文件夹自身的名称探测。
+        """
+        for name in names:
+            swapped = name.swapcase()
+            if swapped != name:
+                return os.path.exists(os.path.join(dir_path, swapped))
+        parent_dir, folder_name = os.path.split(os.path.normpath(dir_path))
+        swapped = folder_name.swapcase()
+        if swapped == folder_name:
+            return False
+        return os.path.exists(os.path.join(parent_dir, swapped))
+
+    def _name_key(self, target_dir, filename):
+        """文件名在索引中的键：忽略大小写的文件夹用 casefold，否则按系统规则规范大小写"""
+        self._dir_index(target_dir)
+        if self._dir_casefold[target_dir]:
+            return filename.casefold()
+        return os.path.normcase(filename)
+
+    def _dir_index(self, dir_path, names=None):
+        """获取目标文件夹的文件名索引，不存在时读取目录建立（每个文件夹只探测一次大小写规则）"""
+        index = self._dir_indexes.get(dir_path)
+        if index is None:
+            if names is None:
+                try:
+                    names = os.listdir(dir_path)
+                except OSError:
+                    names = []
+            casefold = self._is_case_insensitive(dir_path, names)
+            self._dir_casefold[dir_path] = casefold
+            if casefold:
+                index = {name.casefold() for name in names}
+            else:
+                index = {os.path.normcase(name) for name in names}
+            self._dir_indexes[dir_path] = index
+        return index
+
+    def _name_taken(self, target_dir, filename):
+        """检查目标文件夹中是否已存在（或已分配）该文件名"""
+        return self._name_key(target_dir, filename) in self._dir_index(target_dir)
+
+    def _reserve_name(self, target_dir, filename):
+        """登记已分配的文件名，后续冲突检查只需查内存索引"""
+        self._dir_index(target_dir).add(self._name_key(target_dir, filename))
+
     def get_unique_filename(self, target_dir, filename):
         """处理文件名冲突，返回唯一文件名"""
         base_name, ext = os.path.splitext(filename)
-        counter = 1
+        index = self._dir_index(target_dir)
+        # 记录每个文件名上次用到的序号，大量同名文件时无需每次从 (1) 开始探测
+        key = (target_dir, self._name_key(target_dir, filename))
+        counter = self._rename_counters.get(key, 1)
         new_filename = filename
-        while os.path.exists(os.path.join(target_dir, new_filename)):
+        while self._name_key(target_dir, new_filename) in index:
             new_filename = f"{base_name} ({counter}){ext}"
             counter += 1
+        self._rename_counters[key] = counter
         return new_filename
 
+    def _load_target_cache(self, target_parent):
+        """读取目标目录下的计数缓存，文件缺失或损坏时返回 None"""
+        cache_path = os.path.join(target_parent, INDEX_FILE_NAME)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cache, dict) or cache.get('version') != 1 or not isinstance(cache.get('folders'), dict):
+            return None
+        return cache
+
+    def _save_target_cache(self, target_parent):
+        """保存各 Merged_N 文件夹的文件数和修改时间，供下次合并跳过重新统计
+
+        本次发现的文件夹全部写入；未统计过的只记录名称，下次使用前再统计。
+        """
+        folders = {name: {} for name in self._known_folders}
+        folders.update(self._folder_stats)
+        try:
+            # 本次写入过的文件夹重新统计一次，保证缓存与磁盘一致
+            for dir_path in self._used_targets:
+                with os.scandir(dir_path) as it:
+                    count = sum(1 for entry in it if entry.is_file())
+                folders[os.path.basename(dir_path)] = {'count': count, 'mtime_ns': os.stat(dir_path).st_mtime_ns}
+
+            cache_path = os.path.join(target_parent, INDEX_FILE_NAME)
+            if not os.path.exists(cache_path):
+                # 先创建文件，之后原地改写内容不会再改变目标目录的修改时间
+                open(cache_path, 'w').close()
+            # 记录目标目录修改时间，下次据此判断文件夹列表是否变化
+            parent_mtime_ns = os.stat(target_parent).st_mtime_ns
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'parent_mtime_ns': parent_mtime_ns, 'folders': folders}, f)
+        except (OSError, ValueError) as e:
+            self.log(f"保存目标文件夹索引失败: {e}")
+
+    def _make_target_dir(self, dir_path):
+        """创建 Merged_N 文件夹，返回是否为新建；父目录已确保存在，直接 os.mkdir，省去 makedirs 的额外检查"""
+        try:
+            os.mkdir(dir_path)
+        except FileExistsError:
+            if not os.path.isdir(dir_path):
+                raise
+            return False
+        return True
+
+    def _count_target_dir(self, dir_path):
+        """计算现有文件数，同时建立文件名索引（DirEntry 自带类型信息，无需逐个 stat）"""
+        names = []
+        current_count = 0
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                names.append(entry.name)
+                if entry.is_file():
+                    current_count += 1
+        self._dir_index(dir_path, names)
+        return current_count
+
     def get_writable_targets(self, target_parent, limit):
         """生成器：返回可写入的目标文件夹路径和剩余容量"""
         existing_folders = {}
         max_index = 0
+        self._folder_stats = {}
+        self._known_folders = []
+        self._used_targets = []
         
         try:
             if not os.path.exists(target_parent):
                 os.makedirs(target_parent, exist_ok=True)
+
+            parent_prefix = os.path.join(target_parent, '')
+            cache = self._load_target_cache(target_parent)
+            cached_folders = cache['folders'] if cache else {}
             
             # 1. 扫描现有文件夹，建立索引映射
-            for name in os.listdir(target_parent):
-                if os.path.isdir(os.path.join(target_parent, name)):
-                    match = re.match(r'^Merged_(\d+)$', name)
-                    if match:
-                        index = int(match.group(1))
-                        existing_folders[index] = name
-                        if index > max_index:
-                            max_index = index
+            if cache and cache.get('parent_mtime_ns') == os.stat(target_parent).st_mtime_ns:
+                # 目标目录自上次保存缓存后没有增删条目，直接使用缓存中的文件夹列表
+                names = list(cached_folders)
+            else:
+                with os.scandir(target_parent) as it:
+                    names = [entry.name for entry in it if entry.is_dir()]
+            for name in names:
+                match = MERGED_DIR_RE.fullmatch(name)
+                if match:
+                    index = int(match.group(1))
+                    existing_folders[index] = name
+                    if index > max_index:
+                        max_index = index
+            self._known_folders = list(existing_folders.values())
+            # 未统计到的已有文件夹沿用旧缓存，下次再校验
+            self._folder_stats = {name: cached_folders[name] for name in existing_folders.values() if name in cached_folders}
             
             # 2. 遍历从 1 到 max_index 的所有可能索引（填充空缺和未满的）
             if max_index > 0:
                 for i in range(1, max_index + 1):
                     if i in existing_folders:
                         dir_name = existing_folders[i]
-                        dir_path = os.path.join(target_parent, dir_name)
-                        # 计算现有文件数
-                        current_count = len([name for name in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, name))])
+                        dir_path = parent_prefix + dir_name
+                        mtime_ns = os.stat(dir_path).st_mtime_ns
+                        cached = cached_folders.get(dir_name)
+                        if isinstance(cached, dict) and cached.get('mtime_ns') == mtime_ns:
+                            # 文件夹自上次合并后未被修改，直接使用缓存的文件数（文件名索引按需再读取）
+                            current_count = cached['count']
+                        else:
+                            current_count = self._count_target_dir(dir_path)
+                        self._folder_stats[dir_name] = {'count': current_count, 'mtime_ns': mtime_ns}
                     else:
                         # 文件夹缺失，需要创建
                         dir_name = f"Merged_{i}"
-                        dir_path = os.path.join(target_parent, dir_name)
-                        current_count = 0
-                        os.makedirs(dir_path, exist_ok=True)
+                        dir_path = parent_prefix + dir_name
+                        if self._make_target_dir(dir_path):
+                            current_count = 0
+                            self._dir_index(dir_path, [])
+                        else:
+                            # 文件夹其实已存在（未在列表中发现或期间被创建），按实际内容统计
+                            current_count = self._count_target_dir(dir_path)
                     
                     remaining = limit - current_count
                     if remaining > 0:
+                        self._used_targets.append(dir_path)
                         yield dir_path, remaining
             
             # 3. 如果所有现有文件夹都满了，或没有现有文件夹，从 max_index + 1 开始创建新文件夹
             next_index = max_index + 1
             while True:
                 dir_name = f"Merged_{next_index}"
-                dir_path = os.path.join(target_parent, dir_name)
-                os.makedirs(dir_path, exist_ok=True)
-                yield dir_path, limit
+                dir_path = parent_prefix + dir_name
                 next_index += 1
+                if self._make_target_dir(dir_path):
+                    remaining = limit
+                    self._dir_index(dir_path, [])
+                else:
+                    # 文件夹其实已存在，不能当作空文件夹覆盖写入
+                    remaining = limit - self._count_target_dir(dir_path)
+                    if remaining <= 0:
+                        continue
+                self._used_targets.append(dir_path)
+                yield dir_path, remaining
                 
         except Exception as e:
             self.log(f"扫描目标文件夹时出错: {e}")
@@ -122,9 +404,162 @@ class MergerCore:
             while True:
                 dir_path = os.path.join(target_parent, f"Merged_{i}")
                 os.makedirs(dir_path, exist_ok=True)
+                self._used_targets.append(dir_path)
                 yield dir_path, limit
                 i += 1
 
+    def _same_filesystem(self, source_dir, target_parent):
+        """判断源目录与目标目录是否位于同一文件系统"""
+        try:
+            return os.stat(source_dir).st_dev == os.stat(target_parent).st_dev
+        except OSError:
+            return False
+
+    def _remove_empty_dirs(self, source_dir, candidates):
+        """自底向上删除空目录：从候选目录开始，删除成功后再尝试其上一级，确保不删除源根目录"""
+        root_key = os.path.normcase(os.path.abspath(source_dir))
+        seen = set(candidates)
+        heap = [(-path.count(os.sep), path) for path in seen]
+        heapq.heapify(heap)
+        while heap:
+            # 取出同一深度的全部目录，按父目录分组处理
+            depth = heap[0][0]
+            groups = {}
+            while heap and heap[0][0] == depth:
+                dir_path = heapq.heappop(heap)[1]
+                if os.path.normcase(os.path.abspath(dir_path)) == root_key:
+                    continue
+                groups.setdefault(os.path.dirname(dir_path), []).append(dir_path)
+
+            for parent_dir, dir_paths in groups.items():
+                if self._rmdir_siblings(parent_dir, dir_paths) and parent_dir not in seen:
+                    seen.add(parent_dir)
+                    heapq.heappush(heap, (-parent_dir.count(os.sep), parent_dir))
+
+    def _rmdir_siblings(self, parent_dir, dir_paths):
+        """删除同一父目录下的若干空目录，返回是否至少删除了一个
+
+        支持 dir_fd 的系统上共用父目录句柄，按名称删除，省去逐个解析完整路径。
+        """
+        parent_fd = None
+        if len(dir_paths) > 1 and os.rmdir in os.supports_dir_fd:
+            try:
+                parent_fd = os.open(parent_dir, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except OSError:
+                parent_fd = None
+
+        removed = False
+        try:
+            for dir_path in dir_paths:
+                try:
+                    if parent_fd is None:
+                        os.rmdir(dir_path)
+                    else:
+                        os.rmdir(os.path.basename(dir_path), dir_fd=parent_fd)
+                    removed = True
+                except OSError:
+                    pass # 文件夹非空，忽略
+        finally:
+            if parent_fd is not None:
+                os.close(parent_fd)
+        return removed
+
+    def _rename_batch(self, pairs):
+        """批量执行同一文件系统内的移动，返回 [(源路径, 异常或 None), ...]
+
+        循环内只有一次 os.replace 调用；个别文件遇到跨挂载点时退回 shutil.move。
+        每个文件前检查停止标志，停止后剩余的文件不再移动。
+        """
+        replace = os.replace
+        results = []
+        append = results.append
+        for src, dst in pairs:
+            if self.stop_flag:
+                break
+            try:
+                replace(src, dst)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    append((src, e))
+                    continue
+                try:
+                    shutil.move(src, dst) # 跨挂载点等情况，退回复制+删除
+                except Exception as e2:
+                    append((src, e2))
+                    continue
+            append((src, None))
+        return results
+
+    def _execute(self, tasks, threads, operation, rename_only=False):
+        """生成器：对 (源路径, 目标路径) 任务执行 operation，逐个返回 (源路径, 异常或 None)
+
+        rename_only 为 True 时（同一文件系统内移动）不调用 operation，改为 _rename_batch 串行批量重命名。
+        """
+        if rename_only:
+            # 同一文件系统内的移动只是重命名，按批执行以减少逐个文件的调度开销
+            tasks = iter(tasks)
+            while not self.stop_flag:
+                batch = list(islice(tasks, RENAME_BATCH_SIZE))
+                if not batch:
+                    return
+                yield from self._rename_batch(batch)
+            return
+
+        if threads <= 1:
+            for src_path, dest_path in tasks:
+                if self.stop_flag:
+                    return
+                try:
+                    operation(src_path, dest_path)
+                except Exception as e:
+                    yield src_path, e
+                else:
+                    yield src_path, None
+            return
+
+        # 多线程：I/O 等待期间可同时进行多个文件操作（适合网络共享、机械硬盘等）
+        max_pending = threads * 4 # 限制排队任务数，任务随扫描逐步提交
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            running = {}
+            last_by_dest = {}
+            try:
+                for src_path, dest_path in tasks:
+                    if self.stop_flag:
+                        break
+                    # 覆盖模式下同一目标可能被写入多次，需等上一次完成以保持先后顺序
+                    previous = last_by_dest.get(dest_path)
+                    if previous is not None:
+                        wait([previous])
+                    if len(running) >= max_pending:
+                        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                        yield from self._collect(finished, running, last_by_dest)
+                    future = executor.submit(operation, src_path, dest_path)
+                    running[future] = (src_path, dest_path)
+                    last_by_dest[dest_path] = future
+
+                while running and not self.stop_flag:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    yield from self._collect(finished, running, last_by_dest)
+
+                # 停止时：取消尚未开始的任务，已在执行的任务等其结束并照常返回结果
+                for future in list(running):
+                    if future.cancel():
+                        del running[future]
+                if running:
+                    finished, _ = wait(running)
+                    yield from self._collect(finished, running, last_by_dest)
+            finally:
+                for future in running:
+                    future.cancel()
+
+    def _collect(self, finished, running, last_by_dest):
+        """生成器：整理已完成的任务，返回 (源路径, 异常或 None)"""
+        for future in finished:
+            src_path, dest_path = running.pop(future)
+            if last_by_dest.get(dest_path) is future:
+                del last_by_dest[dest_path]
+            yield src_path, future.exception()
+
     def process(self, config):
         source_dir = config['source_dir']
         target_parent = config['target_parent']
@@ -133,103 +568,133 @@ class MergerCore:
         rename_mode = config['rename_mode']
         conflict_mode = config['conflict_mode']
         prefix = config['custom_prefix']
+        threads = max(1, int(config.get('threads', 1)))
 
         self.log(f"开始处理: 源={source_dir}, 目标父目录={target_parent}")
-        
-        # 1. 扫描文件
-        self.log("正在扫描文件...")
-        all_files = []
-        for file_path in self.scan_files(source_dir):
-            if self.stop_flag:
-                self.log("操作已取消")
-                return
-            all_files.append(file_path)
-        
-        total_files = len(all_files)
-        self.log(f"扫描完成，共找到 {total_files} 个文件")
+        self._dir_indexes = {}
+        self._dir_casefold = {}
+        self._rename_counters = {}
+        self._touched_parents = set()
 
-        # 2. 处理文件
-        processed_count = 0
-        
         # 获取目标文件夹生成器
         target_gen = self.get_writable_targets(target_parent, limit)
         current_target_dir, slots_left = next(target_gen)
+        # 目标路径前缀（带结尾分隔符），循环内直接拼接文件名，无需每次 os.path.join
+        target_prefix = os.path.join(current_target_dir, '')
         
         # 如果是首次创建，可能需要记录日志
         self.log(f"当前写入目标: {os.path.basename(current_target_dir)} (剩余容量: {slots_left})")
 
-        for src_path in all_files:
-            if self.stop_flag:
-                break
+        # 同一文件系统内的移动只是重命名，并发没有收益，且会与父目录清理相互干扰
+        rename_only = op_mode == 'move' and self._same_filesystem(source_dir, target_parent)
+        if rename_only:
+            threads = 1
+
+        # 操作方式与重命名规则在循环外一次选定，循环内只需一次函数调用
+        operation = shutil.move if op_mode == 'move' else _fast_copy
+
+        if rename_mode == 'parent_name':
+            make_name = lambda parent_name, name, seq: f"{parent_name}_{name}"
+        elif rename_mode == 'prefix':
+            # 注意：这里使用序号可能导致与旧文件重名，
+            # 如果是追加模式，最好结合 folder_index 或者使用更复杂的计数。
+            # 但为了简单且符合“自定义前缀+序号”，我们继续用全局计数，
+            # 但要考虑到如果之前已经有了 file_1.txt，现在再来一个 file_1.txt 会冲突。
+            # 冲突处理逻辑会解决这个问题 (get_unique_filename)。
+            make_name = lambda parent_name, name, seq: f"{prefix}_{seq}{os.path.splitext(name)[1]}"
+        else:
+            make_name = None # 保留原名（默认设置），循环内直接使用扫描得到的文件名
+        check_conflicts = conflict_mode != 'overwrite'
+
+        # 1. 后台线程扫描文件，经有界队列交给当前线程分配目标路径（串行执行，保证文件名分配确定且无竞争）
+        #    扫描与复制/移动同时进行，首个文件无需等待扫描结束即可开始处理
+        self.log("正在扫描并处理文件...")
+        scanned_count = 0
+        skipped_count = 0
+        scan_queue = queue.Queue(maxsize=SCAN_QUEUE_SIZE)
+        scan_done = threading.Event()
+        consumer_done = threading.Event()
+        self._scan_total = 0
+        scanner = threading.Thread(target=self._scanner,
+                                   args=(source_dir, target_parent, scan_queue, scan_done, consumer_done),
+                                   daemon=True)
+        scanner.start()
+
+        def allocate():
+            nonlocal current_target_dir, target_prefix, slots_left, scanned_count, skipped_count
+            while True:
+                item = scan_queue.get()
+                if item is None or self.stop_flag:
+                    break
+                src_path, original_name, parent_name = item
+                scanned_count += 1
+
+                # 检查是否需要切换文件夹
+                if slots_left <= 0:
+                    current_target_dir, slots_left = next(target_gen)
+                    target_prefix = os.path.join(current_target_dir, '')
+                    self.log(f"切换到新文件夹: {os.path.basename(current_target_dir)} (容量: {slots_left})")
+
+                # 计算新文件名
+                if make_name is None:
+                    new_name = original_name
+                else:
+                    new_name = make_name(parent_name, original_name, scanned_count)
+                
+                # 处理冲突（覆盖模式无论是否重名都直接写入，无需检查）
+                dest_path = target_prefix + new_name
+                if check_conflicts:
+                    if self._name_taken(current_target_dir, new_name):
+                        if conflict_mode == 'skip':
+                            self.log(f"跳过冲突文件: {new_name}")
+                            skipped_count += 1 # 视为已处理（虽然是跳过）
+                            continue
+                        elif conflict_mode == 'auto_rename':
+                            new_name = self.get_unique_filename(current_target_dir, new_name)
+                            dest_path = target_prefix + new_name
+
+                    self._reserve_name(current_target_dir, new_name)
+                slots_left -= 1
+                yield src_path, dest_path
 
-            # 检查是否需要切换文件夹
-            if slots_left <= 0:
-                current_target_dir, slots_left = next(target_gen)
-                self.log(f"切换到新文件夹: {os.path.basename(current_target_dir)} (容量: {slots_left})")
-
-            # 计算新文件名
-            src_path_obj = Path(src_path)
-            original_name = src_path_obj.name
-            new_name = original_name
-
-            if rename_mode == 'parent_name':
-                parent_name = src_path_obj.parent.name
-                new_name = f"{parent_name}_{original_name}"
-            elif rename_mode == 'prefix':
-                # 注意：这里使用 processed_count 可能导致与旧文件重名，
-                # 如果是追加模式，最好结合 folder_index 或者使用更复杂的计数。
-                # 但为了简单且符合“自定义前缀+序号”，我们继续用全局计数，
-                # 但要考虑到如果之前已经有了 file_1.txt，现在再来一个 file_1.txt 会冲突。
-                # 冲突处理逻辑会解决这个问题 (get_unique_filename)。
-                new_name = f"{prefix}_{processed_count + 1}{src_path_obj.suffix}"
-            
-            # 处理冲突
-            dest_path = os.path.join(current_target_dir, new_name)
-            if os.path.exists(dest_path):
-                if conflict_mode == 'skip':
-                    self.log(f"跳过冲突文件: {new_name}")
-                    processed_count += 1 # 视为已处理（虽然是跳过）
+        # 2. 执行文件操作（扫描仍在进行时总数未知，进度总数传 None）
+        done_count = 0
+        try:
+            for src_path, error in self._execute(allocate(), threads, operation, rename_only):
+                if error is not None:
+                    self.log(f"错误处理文件 {src_path}: {error}")
                     continue
-                elif conflict_mode == 'overwrite':
-                    pass # 默认就是覆盖
-                elif conflict_mode == 'auto_rename':
-                    new_name = self.get_unique_filename(current_target_dir, new_name)
-                    dest_path = os.path.join(current_target_dir, new_name)
 
-            # 执行操作
-            try:
+                done_count += 1
+                processed_count = done_count + skipped_count
                 if op_mode == 'move':
-                    shutil.move(src_path, dest_path)
-                    # 及时尝试删除空的父文件夹
-                    try:
-                        parent_dir = os.path.dirname(src_path)
-                        # 确保不删除源根目录
-                        if os.path.abspath(parent_dir) != os.path.abspath(source_dir):
-                            os.rmdir(parent_dir)
-                    except OSError:
-                        pass # 文件夹非空，忽略
-                else:
-                    shutil.copy2(src_path, dest_path)
-                
-                slots_left -= 1
-                processed_count += 1
+                    self._touched_parents.add(os.path.dirname(src_path))
                 
                 if processed_count % 100 == 0:
                      if self.update_callback:
-                        self.update_callback("processing", processed_count, total_files)
-
-            except Exception as e:
-                self.log(f"错误处理文件 {src_path}: {e}")
-
-        # 3. 最终清理空文件夹 (仅在移动模式下，作为兜底)
-        if op_mode == 'move' and not self.stop_flag:
+                        total = self._scan_total if scan_done.is_set() else None
+                        self.update_callback("processing", processed_count, total)
+        finally:
+            # 通知扫描线程不再读取队列，并等待其退出
+            consumer_done.set()
+            scanner.join()
+
+        processed_count = done_count + skipped_count
+        total_files = self._scan_total if scan_done.is_set() else scanned_count
+        if self.stop_flag:
+            self.log("操作已取消")
+
+        self._save_target_cache(target_parent)
+
+        # 3. 清理空文件夹 (仅在移动模式下)
+        #    只处理移出过文件的目录和扫描时本就为空的目录，并逐级向上，无需再次遍历整个源目录
+        if op_mode == 'move':
             self.log("正在执行最终清理...")
-            for root, dirs, files in os.walk(source_dir, topdown=False):
-                for name in dirs:
-                    try:
-                        os.rmdir(os.path.join(root, name))
-                    except OSError:
-                        pass # 文件夹非空，忽略
+            candidates = set(self._touched_parents)
+            if not self.stop_flag:
+                candidates.update(self._empty_dirs)
+            self._remove_empty_dirs(source_dir, candidates)
+            self._touched_parents.clear()
 
         self.log("任务完成!")
         if self.update_callback:
@@ -252,9 +717,19 @@ class App:
         
         self.core = None
         self.thread = None
+        # 进度更新只保留最新一条，避免大量 after(0) 回调挤占 Tk 事件队列
+        self._progress_q = queue.Queue(maxsize=1)
+        self._scan_found = 0
+        self._processing_started = False
+        # 日志缓冲，定时一次性插入文本框，减少 Tk 重绘次数
+        self._log_buf = []
+        self._log_dropped = 0
+        self._log_lock = threading.Lock()
         
         self._init_vars()
         self._init_ui()
+        self.root.after(100, self._drain_progress)
+        self.root.after(200, self._flush_log)
 
     def _init_vars(self):
         self.source_dir = tk.StringVar()
@@ -264,6 +739,7 @@ class App:
         self.rename_mode = tk.StringVar(value="keep")
         self.conflict_mode = tk.StringVar(value="auto_rename")
         self.custom_prefix = tk.StringVar(value="File")
+        self.threads = tk.IntVar(value=1)
         self.progress_var = tk.DoubleVar(value=0)
         self.status_var = tk.StringVar(value="准备就绪")
         
@@ -294,6 +770,8 @@ class App:
                         self.conflict_mode.set(config['conflict_mode'])
                     if 'custom_prefix' in config:
                         self.custom_prefix.set(config['custom_prefix'])
+                    if 'threads' in config:
+                        self.threads.set(config['threads'])
 
         except Exception as e:
             print(f"Error loading config: {e}")
@@ -306,7 +784,8 @@ class App:
             'operation_mode': self.op_mode.get(),
             'rename_mode': self.rename_mode.get(),
             'conflict_mode': self.conflict_mode.get(),
-            'custom_prefix': self.custom_prefix.get()
+            'custom_prefix': self.custom_prefix.get(),
+            'threads': self.threads.get()
         }
         try:
             with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
@@ -346,6 +825,10 @@ class App:
         ttk.Radiobutton(mode_frame, text="复制 (保留源文件)", variable=self.op_mode, value="copy").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(mode_frame, text="移动 (删除源文件)", variable=self.op_mode, value="move").pack(side=tk.LEFT, padx=5)
 
+        # 并发设置
+        ttk.Label(settings_frame, text="并发线程数 (网络/慢速磁盘可调大):").grid(row=2, column=0, sticky="w")
+        ttk.Entry(settings_frame, textvariable=self.threads, width=10).grid(row=2, column=1, sticky="w")
+
         # 3. 文件名处理
         rename_frame = ttk.LabelFrame(main_frame, text="文件名处理", padding="5")
         rename_frame.pack(fill=tk.X, pady=5)
@@ -394,7 +877,24 @@ class App:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
     def log(self, msg):
-        self.root.after(0, self._append_log, msg)
+        """可由任意线程调用：日志先进入缓冲区，由 _flush_log 定时批量写入界面"""
+        with self._log_lock:
+            self._log_buf.append(msg)
+            if len(self._log_buf) > LOG_BUFFER_LIMIT:
+                # 日志产生过快时丢弃中间部分，保留最早和最新的记录
+                del self._log_buf[LOG_BUFFER_LIMIT // 2]
+                self._log_dropped += 1
+
+    def _flush_log(self):
+        self.root.after(200, self._flush_log)
+        with self._log_lock:
+            if not self._log_buf:
+                return
+            lines, self._log_buf = self._log_buf, []
+            dropped, self._log_dropped = self._log_dropped, 0
+        if dropped:
+            lines.insert(LOG_BUFFER_LIMIT // 2, f"... 省略 {dropped} 条日志 ...")
+        self._append_log("\n".join(lines))
 
     def _append_log(self, msg):
         self.log_text.configure(state=tk.NORMAL)
@@ -417,16 +917,44 @@ class App:
             self.save_config()
 
     def update_progress(self, stage, current, total):
+        """由工作线程调用：只保留最新一条进度，界面由 _drain_progress 定时刷新"""
+        item = (stage, current, total)
+        while True:
+            try:
+                self._progress_q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._progress_q.get_nowait() # 丢弃旧进度
+                except queue.Empty:
+                    pass
+
+    def _drain_progress(self):
+        self.root.after(100, self._drain_progress)
+        try:
+            stage, current, total = self._progress_q.get_nowait()
+        except queue.Empty:
+            return
+        self._show_progress(stage, current, total)
+
+    def _show_progress(self, stage, current, total):
         if stage == "scanning":
-            self.root.after(0, lambda: self.status_var.set(f"正在扫描文件... 已找到 {current} 个"))
+            self._scan_found = current
+            if not self._processing_started:
+                self.status_var.set(f"正在扫描文件... 已找到 {current} 个")
         elif stage == "processing":
+            self._processing_started = True
+            if total is None:
+                # 扫描与处理同时进行，总数尚未确定
+                self.status_var.set(f"正在处理: {current}/? (已扫描 {self._scan_found} 个)")
+                return
             percent = (current / total) * 100 if total > 0 else 0
-            self.root.after(0, lambda: self.progress_var.set(percent))
-            self.root.after(0, lambda: self.status_var.set(f"正在处理: {current}/{total} ({percent:.1f}%)"))
+            self.progress_var.set(percent)
+            self.status_var.set(f"正在处理: {current}/{total} ({percent:.1f}%)")
         elif stage == "done":
-            self.root.after(0, lambda: self.progress_var.set(100))
-            self.root.after(0, lambda: self.status_var.set("完成!"))
-            self.root.after(0, self.task_finished)
+            self.progress_var.set(100)
+            self.status_var.set("完成!")
+            self.task_finished()
 
     def start_task(self):
         source = self.source_dir.get()
@@ -453,7 +981,8 @@ class App:
             'operation_mode': self.op_mode.get(),
             'rename_mode': self.rename_mode.get(),
             'conflict_mode': self.conflict_mode.get(),
-            'custom_prefix': self.custom_prefix.get()
+            'custom_prefix': self.custom_prefix.get(),
+            'threads': self.threads.get()
         }
 
         self.btn_start.config(state=tk.DISABLED)
@@ -462,6 +991,8 @@ class App:
         self.log_text.delete(1.0, tk.END)
         self.log_text.configure(state=tk.DISABLED)
         
+        self._scan_found = 0
+        self._processing_started = False
         self.core = MergerCore(update_callback=self.update_progress, log_callback=self.log)
         self.thread = threading.Thread(target=self.core.process, args=(config,))
         self.thread.daemon = True
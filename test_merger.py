@@ -2,12 +2,14 @@ import unittest
 import os
 import shutil
 import tempfile
+import json
+import time
 import sys
 
 # 确保能导入 folder_merger
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from folder_merger import MergerCore
+from folder_merger import MergerCore, _fast_copy
 
 class TestMerger(unittest.TestCase):
     def setUp(self):
@@ -58,6 +60,192 @@ class TestMerger(unittest.TestCase):
         collision_files = [f for f in files if f.startswith("file1 (")]
         self.assertEqual(len(collision_files), 1)
 
+    def test_many_collisions(self):
+        """测试大量同名文件的自动重命名"""
+        for i in range(5):
+            d = os.path.join(self.source_dir, f"dup_{i}")
+            os.makedirs(d)
+            with open(os.path.join(d, "file1.txt"), "w") as f: f.write(str(i))
+
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        files = set(os.listdir(os.path.join(self.target_dir, "Merged_1")))
+        expected = {"file1.txt", "file2.txt"} | {f"file1 ({i}).txt" for i in range(1, 7)}
+        self.assertEqual(files, expected)
+
+    def test_case_insensitive_collisions(self):
+        """测试忽略大小写的目标文件夹中仅大小写不同的文件名视为冲突"""
+        class CaseInsensitiveCore(MergerCore):
+            def _is_case_insensitive(self, dir_path, names):
+                return True
+
+        for i, name in enumerate(["Photo.JPG", "photo.jpg"]):
+            d = os.path.join(self.source_dir, f"case_{i}")
+            os.makedirs(d)
+            with open(os.path.join(d, name), "w") as f: f.write(str(i))
+
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        CaseInsensitiveCore().process(config)
+
+        files = os.listdir(os.path.join(self.target_dir, "Merged_1"))
+        photos = sorted(name.casefold() for name in files if name.casefold().startswith("photo"))
+        self.assertEqual(photos, ["photo (1).jpg", "photo.jpg"])
+
+        # 区分大小写的文件系统上（本机临时目录）探测结果应为 False
+        core = MergerCore()
+        self.assertFalse(core._is_case_insensitive(self.target_dir, os.listdir(self.target_dir)))
+
+    def test_fast_copy(self):
+        """测试快速复制保留内容和修改时间"""
+        src = os.path.join(self.source_dir, "file1.txt")
+        os.utime(src, (1000000000, 1000000000))
+        dst = os.path.join(self.target_dir, "copied.txt")
+        _fast_copy(src, dst)
+
+        with open(dst) as f:
+            self.assertEqual(f.read(), "content1")
+        self.assertEqual(int(os.path.getmtime(dst)), 1000000000)
+
+    def test_overwrite(self):
+        """测试覆盖模式：重名文件直接覆盖，后处理的文件生效"""
+        merged_1 = os.path.join(self.target_dir, "Merged_1")
+        os.makedirs(merged_1)
+        with open(os.path.join(merged_1, "file2.txt"), "w") as f: f.write("old")
+
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'overwrite',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        self.assertEqual(sorted(os.listdir(merged_1)), ["file1.txt", "file2.txt"])
+        with open(os.path.join(merged_1, "file2.txt")) as f:
+            self.assertEqual(f.read(), "content2")
+
+    def test_progress_total_published(self):
+        """测试扫描结束后进度回调带上文件总数"""
+        for i in range(250):
+            with open(os.path.join(self.source_dir, f"bulk_{i}.txt"), "w") as f: f.write(str(i))
+
+        events = []
+        core = MergerCore(update_callback=lambda stage, current, total: events.append((stage, current, total)))
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 1000,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        self.assertEqual(events[-1], ("done", 253, 253))
+        for stage, current, total in events:
+            if stage == "processing":
+                self.assertIn(total, (None, 253))
+
+    @unittest.skipUnless(hasattr(os, 'link'), "需要支持硬链接的系统")
+    def test_fast_copy_same_file(self):
+        """测试目标是源文件的硬链接时拒绝复制，源文件内容不被清空"""
+        src = os.path.join(self.source_dir, "file1.txt")
+        dst = os.path.join(self.target_dir, "linked.txt")
+        os.link(src, dst)
+
+        with self.assertRaises(shutil.SameFileError):
+            _fast_copy(src, dst)
+        with open(src) as f:
+            self.assertEqual(f.read(), "content1")
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), "需要支持命名管道的系统")
+    def test_special_file_fails_cleanly(self):
+        """测试命名管道不会导致复制阻塞，而是报错跳过"""
+        fifo = os.path.join(self.source_dir, "pipe")
+        os.mkfifo(fifo)
+        with self.assertRaises(shutil.SpecialFileError):
+            _fast_copy(fifo, os.path.join(self.target_dir, "pipe"))
+
+        logs = []
+        core = MergerCore(log_callback=logs.append)
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        files = os.listdir(os.path.join(self.target_dir, "Merged_1"))
+        self.assertNotIn("pipe", files)
+        self.assertEqual(len(files), 3)
+        self.assertTrue(any("named pipe" in line for line in logs))
+
+    def test_rename_batch_results(self):
+        """测试批量移动：逐个返回结果，失败的文件带上异常，停止后不再移动"""
+        src1 = os.path.join(self.source_dir, "file1.txt")
+        missing = os.path.join(self.source_dir, "missing.txt")
+        src2 = os.path.join(self.source_dir, "sub1", "file2.txt")
+        core = MergerCore()
+        results = core._rename_batch([
+            (src1, os.path.join(self.target_dir, "a.txt")),
+            (missing, os.path.join(self.target_dir, "b.txt")),
+            (src2, os.path.join(self.target_dir, "c.txt")),
+        ])
+
+        self.assertEqual([r[0] for r in results], [src1, missing, src2])
+        self.assertIsNone(results[0][1])
+        self.assertIsInstance(results[1][1], FileNotFoundError)
+        self.assertIsNone(results[2][1])
+        self.assertEqual(sorted(os.listdir(self.target_dir)), ["a.txt", "c.txt"])
+
+        core.stop_flag = True
+        src3 = os.path.join(self.source_dir, "sub2", "file1.txt")
+        self.assertEqual(core._rename_batch([(src3, os.path.join(self.target_dir, "d.txt"))]), [])
+        self.assertTrue(os.path.exists(src3))
+
+    @unittest.skipUnless(os.path.isdir("/dev/shm") and os.stat("/dev/shm").st_dev != os.stat(tempfile.gettempdir()).st_dev,
+                         "需要与临时目录不同的文件系统")
+    def test_rename_batch_cross_device(self):
+        """测试批量移动遇到跨设备 (EXDEV) 时退回复制+删除"""
+        other_dir = tempfile.mkdtemp(dir="/dev/shm")
+        self.addCleanup(shutil.rmtree, other_dir)
+        src = os.path.join(self.source_dir, "file1.txt")
+        dst = os.path.join(other_dir, "file1.txt")
+
+        results = MergerCore()._rename_batch([(src, dst)])
+
+        self.assertEqual(results, [(src, None)])
+        self.assertFalse(os.path.exists(src))
+        with open(dst) as f:
+            self.assertEqual(f.read(), "content1")
+
     def test_split_folders(self):
         core = MergerCore()
         config = {
@@ -101,6 +289,90 @@ class TestMerger(unittest.TestCase):
         # 验证源文件夹已被清理（sub1 应该没了，因为它是空的）
         self.assertFalse(os.path.exists(os.path.join(self.source_dir, "sub1")))
 
+    def test_parallel_copy(self):
+        """测试多线程复制"""
+        for i in range(20):
+            with open(os.path.join(self.source_dir, "sub1", f"many_{i}.txt"), "w") as f: f.write(str(i))
+
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 10,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': '',
+            'threads': 4
+        }
+        core.process(config)
+
+        counts = [len(os.listdir(os.path.join(self.target_dir, f"Merged_{i}"))) for i in (1, 2, 3)]
+        self.assertEqual(counts, [10, 10, 3])
+
+    def test_parallel_stop_reports_running(self):
+        """测试多线程停止后，已在执行的任务结果仍会返回"""
+        core = MergerCore()
+        ran = []
+
+        def operation(src, dst):
+            core.stop_flag = True
+            time.sleep(0.05)
+            ran.append(src)
+
+        tasks = [(f"src_{i}", f"dst_{i}") for i in range(8)]
+        results = list(core._execute(tasks, 2, operation))
+        self.assertTrue(ran)
+        self.assertEqual(sorted(src for src, _ in results), sorted(ran))
+        self.assertTrue(all(error is None for _, error in results))
+
+    def test_target_inside_source(self):
+        """测试目标目录与源目录相同时，不会重复处理已合并的文件"""
+        existing = os.path.join(self.source_dir, "Merged_1")
+        os.makedirs(existing)
+        with open(os.path.join(existing, "merged_before.txt"), "w") as f: f.write("old")
+
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.source_dir,
+            'files_per_folder': 2,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        files1 = os.listdir(existing)
+        files2 = os.listdir(os.path.join(self.source_dir, "Merged_2"))
+        self.assertIn("merged_before.txt", files1)
+        self.assertEqual(len(files1) + len(files2), 4)
+        self.assertFalse(os.path.exists(os.path.join(self.source_dir, "Merged_3")))
+
+    def test_index_file_not_merged(self):
+        """测试先以源目录为目标合并后，再合并到其他目标时不会带上索引缓存文件"""
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.source_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        MergerCore().process(config)
+        self.assertTrue(os.path.exists(os.path.join(self.source_dir, ".merger_index.json")))
+
+        # 源目录的上一级作为源，原目标（源目录）成为普通子目录
+        config['source_dir'] = self.test_dir
+        config['target_parent'] = os.path.join(self.test_dir, "elsewhere")
+        os.makedirs(config['target_parent'])
+        MergerCore().process(config)
+
+        files = os.listdir(os.path.join(config['target_parent'], "Merged_1"))
+        self.assertNotIn(".merger_index.json", files)
+
     def test_rename_parent(self):
         core = MergerCore()
         config = {
@@ -123,6 +395,22 @@ class TestMerger(unittest.TestCase):
         self.assertIn("sub1_file2.txt", files)
         self.assertIn("sub2_file1.txt", files)
 
+    def test_rename_prefix(self):
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'copy',
+            'rename_mode': 'prefix',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': 'Photo'
+        }
+        core.process(config)
+        
+        files = os.listdir(os.path.join(self.target_dir, "Merged_1"))
+        self.assertEqual(sorted(files), ["Photo_1.txt", "Photo_2.txt", "Photo_3.txt"])
+
     def test_resume_merge(self):
         """测试断点续传/接续合并"""
         # 1. 预先创建 Merged_1 并放入一个文件
@@ -154,6 +442,112 @@ class TestMerger(unittest.TestCase):
         files2 = os.listdir(merged_2)
         self.assertEqual(len(files2), 2) # 剩下 2 个 new
 
+    def test_resume_with_index_cache(self):
+        """测试接续合并时使用目标目录的计数缓存，并在文件夹被修改后重新统计"""
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 2,
+            'operation_mode': 'copy',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+        self.assertTrue(os.path.exists(os.path.join(self.target_dir, ".merger_index.json")))
+
+        # 外部向 Merged_2 放入文件后，缓存失效，Merged_2 应被视为已满
+        merged_2 = os.path.join(self.target_dir, "Merged_2")
+        with open(os.path.join(merged_2, "external.txt"), "w") as f: f.write("external")
+
+        shutil.rmtree(self.source_dir)
+        os.makedirs(self.source_dir)
+        with open(os.path.join(self.source_dir, "new.txt"), "w") as f: f.write("new")
+
+        MergerCore().process(config)
+
+        self.assertEqual(len(os.listdir(os.path.join(self.target_dir, "Merged_1"))), 2)
+        self.assertEqual(len(os.listdir(merged_2)), 2)
+        self.assertEqual(os.listdir(os.path.join(self.target_dir, "Merged_3")), ["new.txt"])
+
+    def test_cache_keeps_unvisited_folders(self):
+        """测试首次合并未用到的已有文件夹仍记录在缓存中，第二次合并不会覆盖其中的文件"""
+        merged_2 = os.path.join(self.target_dir, "Merged_2")
+        os.makedirs(merged_2)
+        with open(os.path.join(merged_2, "photo.jpg"), "w") as f: f.write("ORIGINAL")
+
+        shutil.rmtree(self.source_dir)
+        os.makedirs(self.source_dir)
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(self.source_dir, name), "w") as f: f.write(name)
+
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 2,
+            'operation_mode': 'move',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        # 第一次只会填满 Merged_1，不会统计 Merged_2
+        MergerCore().process(config)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.target_dir, "Merged_1"))), ["a.txt", "b.txt"])
+        with open(os.path.join(self.target_dir, ".merger_index.json")) as f:
+            self.assertIn("Merged_2", json.load(f)['folders'])
+
+        with open(os.path.join(self.source_dir, "photo.jpg"), "w") as f: f.write("NEW")
+        MergerCore().process(config)
+
+        with open(os.path.join(merged_2, "photo.jpg")) as f:
+            self.assertEqual(f.read(), "ORIGINAL")
+        self.assertEqual(sorted(os.listdir(merged_2)), ["photo (1).jpg", "photo.jpg"])
+
+        # skip 模式下也不能超过文件数量限制
+        with open(os.path.join(self.source_dir, "c.txt"), "w") as f: f.write("c")
+        MergerCore().process(dict(config, conflict_mode='skip'))
+        self.assertEqual(len(os.listdir(merged_2)), 2)
+        self.assertEqual(os.listdir(os.path.join(self.target_dir, "Merged_3")), ["c.txt"])
+
+    def test_existing_folder_missing_from_cache(self):
+        """测试缓存遗漏已存在的文件夹时，不会把它当作空文件夹覆盖其中的文件"""
+        merged_1 = os.path.join(self.target_dir, "Merged_1")
+        merged_2 = os.path.join(self.target_dir, "Merged_2")
+        os.makedirs(merged_1)
+        os.makedirs(merged_2)
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(merged_1, name), "w") as f: f.write("full")
+        with open(os.path.join(merged_2, "photo.jpg"), "w") as f: f.write("ORIGINAL")
+
+        # 构造只记录了 Merged_1 的缓存，且目标目录修改时间与之匹配
+        cache_path = os.path.join(self.target_dir, ".merger_index.json")
+        open(cache_path, "w").close()
+        cache = {
+            'version': 1,
+            'parent_mtime_ns': os.stat(self.target_dir).st_mtime_ns,
+            'folders': {"Merged_1": {'count': 2, 'mtime_ns': os.stat(merged_1).st_mtime_ns}},
+        }
+        with open(cache_path, "w") as f: json.dump(cache, f)
+
+        shutil.rmtree(self.source_dir)
+        os.makedirs(self.source_dir)
+        with open(os.path.join(self.source_dir, "photo.jpg"), "w") as f: f.write("NEW")
+
+        MergerCore().process({
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 2,
+            'operation_mode': 'move',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        })
+
+        with open(os.path.join(merged_2, "photo.jpg")) as f:
+            self.assertEqual(f.read(), "ORIGINAL")
+        self.assertEqual(sorted(os.listdir(merged_2)), ["photo (1).jpg", "photo.jpg"])
+
     def test_timely_cleanup(self):
         """测试及时清理空文件夹"""
         # 使用 move 模式
@@ -178,6 +572,57 @@ class TestMerger(unittest.TestCase):
         self.assertFalse(os.path.exists(deep_dir))
         self.assertFalse(os.path.exists(os.path.join(self.source_dir, "deep")))
 
+    def test_move_removes_empty_tree(self):
+        """测试移动模式下原本为空的子目录也会被清理，源根目录保留"""
+        empty_dir = os.path.join(self.source_dir, "empty", "inner")
+        os.makedirs(empty_dir)
+
+        core = MergerCore()
+        config = {
+            'source_dir': self.source_dir,
+            'target_parent': self.target_dir,
+            'files_per_folder': 100,
+            'operation_mode': 'move',
+            'rename_mode': 'keep',
+            'conflict_mode': 'auto_rename',
+            'custom_prefix': ''
+        }
+        core.process(config)
+
+        self.assertTrue(os.path.isdir(self.source_dir))
+        self.assertEqual(os.listdir(self.source_dir), [])
+
+    def test_scan_nested(self):
+        """测试递归扫描多层目录"""
+        deep_dir = os.path.join(self.source_dir, "a", "b", "c")
+        os.makedirs(deep_dir)
+        with open(os.path.join(deep_dir, "deep.txt"), "w") as f: f.write("deep")
+        os.makedirs(os.path.join(self.source_dir, "empty"))
+
+        core = MergerCore()
+        results = list(core.scan_files(self.source_dir))
+        found = sorted(os.path.relpath(p, self.source_dir) for p, _, _ in results)
+        expected = sorted([
+            "file1.txt",
+            os.path.join("sub1", "file2.txt"),
+            os.path.join("sub2", "file1.txt"),
+            os.path.join("a", "b", "c", "deep.txt"),
+        ])
+        self.assertEqual(found, expected)
+        for path, name, parent_name in results:
+            self.assertEqual(name, os.path.basename(path))
+            self.assertEqual(parent_name, os.path.basename(os.path.dirname(path)))
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), "需要 /proc/self/fd")
+    def test_scan_releases_dir_handle(self):
+        """测试扫描生成器挂起时不占用目录句柄"""
+        core = MergerCore()
+        gen = core.scan_files(self.source_dir)
+        before = len(os.listdir('/proc/self/fd'))
+        next(gen)
+        self.assertEqual(len(os.listdir('/proc/self/fd')), before)
+        gen.close()
+
     def test_fill_gaps_and_partials(self):
         """测试填充空缺文件夹和不完整文件夹"""
         # 场景: